@@ -1,28 +1,42 @@
 import os
 import re
+import time
+import heapq
 import asyncio
-from threading import Thread
-from flask import Flask, send_file
+import unicodedata
+import threading
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from typing import NamedTuple
+from aiohttp import web
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application, CommandHandler, MessageHandler,
     CallbackQueryHandler, ContextTypes, filters
 )
-from difflib import SequenceMatcher
-from pymongo import MongoClient
+from telegram.request import HTTPXRequest
+from rapidfuzz import fuzz, process
+from rapidfuzz.distance import Indel
+from pymongo import MongoClient, InsertOne
+from pymongo.errors import BulkWriteError
+
+try:
+    import uvloop
+except ImportError:  # Not available on Windows
+    uvloop = None
 
 # ==========================
-# Flask Server for Render
+# Health Server for Render (runs on the bot's event loop)
 # ==========================
-app = Flask(__name__)
+async def home(request):
+    return web.Response(text='🎬 Telegram Movie Bot is running!')
 
-@app.route('/')
-def home():
-    return '🎬 Telegram Movie Bot is running!'
+async def health(request):
+    return web.json_response({'status': 'ok', 'bot': 'running'})
 
-@app.route('/health')
-def health():
-    return {'status': 'ok', 'bot': 'running'}
+app = web.Application()
+app.router.add_get('/', home)
+app.router.add_get('/health', health)
 
 # ==========================
 # Environment Variables
@@ -31,58 +45,228 @@ BOT_TOKEN = os.environ.get("BOT_TOKEN")
 PRIVATE_CHANNEL_ID = int(os.environ.get("PRIVATE_CHANNEL_ID", "-1001234567890"))
 ADMIN_IDS = [int(x) for x in os.environ.get("ADMIN_IDS", "123456789").split(",")]
 MONGO_URI = os.environ.get("MONGO_URI")
+PORT = int(os.environ.get("PORT", 10000))
+BOT_API_URL = os.environ.get("BOT_API_URL")  # e.g. http://localhost:8081/bot for a local Bot API server
 DB_NAME = "MovieBot"
 ITEMS_PER_PAGE = 8  # Number of items per page
+MAX_RESULTS = 10 * ITEMS_PER_PAGE  # Cap on results kept per search
+SEARCH_CACHE_SIZE = 512  # Number of recent queries kept in memory
+SEARCH_CACHE_TTL = 300  # Seconds before a cached query is recomputed
+MARKUP_CACHE_SIZE = 256  # Number of rendered result pages kept in memory
+TOKEN_SET_THRESHOLD = 0.6  # Stricter match cutoff for multi-word (token set) queries
+FLUSH_DELAY = 2  # Seconds without new files before queued inserts are written
+FLUSH_BATCH_SIZE = 50  # Queued inserts that trigger a write without waiting
+FLUSH_RETRY_DELAY = 30  # Seconds before retrying inserts MongoDB rejected
+FLUSH_MAX_RETRIES = 5  # Retries before leaving rejected inserts for the next flush
+
+# Separators replaced with spaces, other punctuation dropped, when normalizing
+_SEP_RE = re.compile(r'[._-]')
+_PUNCT_RE = re.compile(r'[^\w\s]+')
+
+# Words that don't tell titles apart: stopwords, years and quality/release tags
+_NOISE_RE = re.compile(
+    r'\b(?:the|a|an|of|and|(?:19|20)\d{2}|\d{3,4}p|4k|uhd|hdr|bluray|brrip|'
+    r'webrip|web|dl|hdtv|x26[45]|h26[45]|hevc|aac)\b'
+)
+
+def normalize_text(text):
+    """Casefold and strip accents/punctuation so "Amélie's" matches "amelies" """
+    text = unicodedata.normalize('NFKD', text).casefold()
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = _PUNCT_RE.sub('', _SEP_RE.sub(' ', text))
+    return ' '.join(text.split())
+
+@lru_cache(maxsize=4096)
+def make_search_name(filename):
+    """Clean a filename for search: drop the extension, then normalize"""
+    return normalize_text(os.path.splitext(filename)[0])
+
+def strip_noise(search_name):
+    """Title words of a normalized name, without stopwords, years or quality tags"""
+    return ' '.join(_NOISE_RE.sub(' ', search_name).split())
+
+def trigrams(text):
+    """Set of 3-character substrings used to prefilter fuzzy candidates"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
 
 # ==========================
 # MongoDB Class (Simplified)
 # ==========================
+class MediaFile(NamedTuple):
+    """One indexed file, as kept in memory and returned by fuzzy_search"""
+    filename: str
+    message_id: int
+    file_id: str
+
 class MediaDatabase:
     def __init__(self):
         self.client = MongoClient(MONGO_URI, tls=True, tlsAllowInvalidCertificates=True)
         self.db = self.client[DB_NAME]
         self.media = self.db["media"]  # Single collection for all files
+
+        # In-memory copy of the collection; searches never hit MongoDB
+        self._index = [
+            MediaFile(doc["filename"], doc["message_id"], doc["file_id"])
+            for doc in self.media.find({}, {"_id": 0, "filename": 1, "message_id": 1, "file_id": 1})
+        ]
+        # Search names kept in a parallel list so scoring never rebuilds it;
+        # recomputed from filenames so older documents get current normalization
+        self._names = [make_search_name(item.filename) for item in self._index]
+        # Same names without noise words, for scoring multi-word queries
+        self._titles = [strip_noise(name) for name in self._names]
+
+        # Trigram -> positions in _index whose search name contains it
+        self._ngram_index = defaultdict(set)
+        for idx, search_name in enumerate(self._names):
+            self._add_trigrams(idx, search_name)
+
+        # Bumped on every insert; cached result pages are only valid for one version
+        self.version = 0
+        self.markup_cache = OrderedDict()  # (query, page) -> (text, markup), LRU ordered
+
+        # Recent fuzzy_search results: key -> (timestamp, results), LRU ordered
+        self._search_cache = OrderedDict()
+
+        # Documents waiting to be written to MongoDB in one bulk_write
+        self._pending = []
+
+        # Searches and flushes run in worker threads; guards the structures above
+        self._lock = threading.Lock()
         
     def add_media(self, message_id, filename, file_id):
-        """Add media file to database"""
-        # Clean filename for search
-        clean_name = os.path.splitext(filename)[0]
-        clean_name = re.sub(r'[._-]', ' ', clean_name).lower()
-        
+        """Add media file to the index and queue it for MongoDB (see flush)"""
         doc = {
             "filename": filename,
-            "search_name": clean_name,
+            "search_name": make_search_name(filename),
             "message_id": message_id,
             "file_id": file_id
         }
-        self.media.insert_one(doc)
+        with self._lock:
+            self._pending.append(doc)
+            self._index.append(MediaFile(filename, message_id, file_id))
+            self._names.append(doc["search_name"])
+            self._titles.append(strip_noise(doc["search_name"]))
+            self._add_trigrams(len(self._names) - 1, doc["search_name"])
+            self.version += 1
+            self.markup_cache.clear()
+            self._search_cache.clear()
 
-    def fuzzy_search(self, query, threshold=0.4):
-        """Search for media files matching query"""
-        query_lower = query.lower()
-        results = []
+    def _add_trigrams(self, idx, search_name):
+        for gram in trigrams(search_name):
+            self._ngram_index[gram].add(idx)
+
+    def fuzzy_search(self, query, threshold=0.4, limit=MAX_RESULTS):
+        """Search for media files matching query (returns a shared, read-only tuple)"""
+        query_norm = normalize_text(query)
+        if not query_norm:
+            return ()
+        cache_key = (query_norm, threshold, limit)
+        
+        # Multi-word queries are compared as token sets so extra words in the
+        # filename (year, quality, release tags) don't drag the score down.
+        # Noise words are dropped from both sides first: token sets sharing
+        # only "the" or "1080p" would otherwise clear the cutoff. Queries made
+        # only of noise words ("2012 1080p") are scored like single words.
+        query_title = strip_noise(query_norm) if ' ' in query_norm else ''
+        query_key = query_title or query_norm
+        query_grams = trigrams(query_key)
         
-        for item in self.media.find():
-            search_name = item.get("search_name", "")
-            # Calculate similarity ratio
-            ratio = SequenceMatcher(None, query_lower, search_name).ratio()
+        with self._lock:
+            cached = self._search_cache.get(cache_key)
+            if cached and time.monotonic() - cached[0] < SEARCH_CACHE_TTL:
+                self._search_cache.move_to_end(cache_key)
+                return cached[1]
             
-            # Include if ratio exceeds threshold OR query is substring
-            if ratio >= threshold or query_lower in search_name:
-                results.append({
-                    "filename": item["filename"],
-                    "message_id": item["message_id"],
-                    "file_id": item["file_id"],
-                    "ratio": ratio
-                })
+            # Only score names sharing a trigram with the query; queries too
+            # short to have trigrams fall back to scanning every name.
+            # Snapshotting the candidates lets add_media run while we score.
+            if query_grams:
+                candidates = set().union(*(self._ngram_index.get(g, ()) for g in query_grams))
+            else:
+                candidates = range(len(self._names))
+            choices = {idx: self._names[idx] for idx in candidates}
+            targets = {idx: self._titles[idx] for idx in candidates} if query_title else choices
+            version = self.version
         
-        # Sort by relevance (highest ratio first)
-        results.sort(key=lambda x: x["ratio"], reverse=True)
+        # One shared word ("man") already gives token sets ~0.5, so they need
+        # a higher cutoff than the Indel-calibrated default
+        if query_title:
+            scorer, scale = fuzz.token_set_ratio, 100
+            threshold = max(threshold, TOKEN_SET_THRESHOLD)
+        else:
+            scorer, scale = Indel.normalized_similarity, 1
+        
+        # Score the candidates in one rapidfuzz call; the cutoff drops names
+        # that can't reach the threshold. Returns (name, score, index).
+        matches = process.extract(
+            query_key, targets, scorer=scorer,
+            score_cutoff=threshold * scale, limit=None
+        )
+        ratios = {idx: score / scale for _, score, idx in matches}
+        
+        # Also include names containing the query, whatever their score.
+        # They rank below every fuzzy hit, ordered by how much of the name
+        # the query covers, so there is no need to run the scorer again.
+        for idx, search_name in choices.items():
+            if idx not in ratios and query_norm in search_name:
+                ratios[idx] = threshold * len(query_norm) / len(search_name)
+        
+        # Keep only the best `limit` matches (highest ratio first). Token sets
+        # score any title containing the query 100, so ties go to the closest
+        # title: "the batman" ranks "batman" above "batman begins".
+        if query_title:
+            rank = lambda kv: (kv[1], Indel.normalized_similarity(query_key, targets[kv[0]]))
+        else:
+            rank = lambda kv: kv[1]
+        top = heapq.nlargest(limit, ratios.items(), key=rank)
+        results = tuple(self._index[idx] for idx, _ in top)
+        
+        # Don't cache results that missed a file added while we were scoring
+        with self._lock:
+            if version == self.version:
+                self._search_cache[cache_key] = (time.monotonic(), results)
+                if len(self._search_cache) > SEARCH_CACHE_SIZE:
+                    self._search_cache.popitem(last=False)
         return results
 
+    def pending_count(self):
+        """Number of inserts queued since the last flush"""
+        return len(self._pending)
+
+    def flush(self):
+        """Write queued media documents to MongoDB in a single round trip.
+        Documents that fail are queued again; returns their filenames."""
+        with self._lock:
+            docs, self._pending = self._pending, []
+        if not docs:
+            return []
+        
+        # bulk_write assigns each doc's _id client-side, so a retry of a
+        # document that did reach the server fails as a duplicate, not a copy
+        try:
+            self.media.bulk_write([InsertOne(doc) for doc in docs], ordered=False)
+            return []
+        except BulkWriteError as e:
+            # Unordered: every op not listed in writeErrors was inserted
+            failed = {
+                err["index"] for err in e.details.get("writeErrors", [])
+                if err.get("code") != 11000  # duplicate key: already stored
+            }
+            retry = [doc for i, doc in enumerate(docs) if i in failed]
+            error = e
+        except Exception as e:
+            retry = docs
+            error = e
+        
+        if retry:
+            print(f"Error writing {len(retry)} queued files, will retry: {error}")
+            with self._lock:
+                self._pending[:0] = retry
+        return [doc["filename"] for doc in retry]
+
     def get_total_count(self):
-        """Get total number of files"""
-        return self.media.count_documents({})
+        """Get total number of files (includes inserts not yet flushed)"""
+        return len(self._index)
 
 # Initialize DB
 db = MediaDatabase()
@@ -90,6 +274,51 @@ db = MediaDatabase()
 # ==========================
 # Bot Handlers
 # ==========================
+_flush_task = None
+_flush_waiting = False  # _flush_task is sleeping, not writing, so it may be cancelled
+
+async def flush_media():
+    """Write queued media to MongoDB; returns filenames that failed"""
+    return await asyncio.to_thread(db.flush)
+
+async def _flush_wait(delay):
+    global _flush_waiting
+    _flush_waiting = True
+    await asyncio.sleep(delay)
+    _flush_waiting = False
+
+async def flush_media_later(application, delay):
+    """Write the queue after `delay`, then again for files queued meanwhile"""
+    await _flush_wait(delay)
+    retries = 0
+    while True:
+        failed = await flush_media()
+        if not failed:
+            if not db.pending_count():
+                return
+            continue
+        # Failed inserts are back on the queue; retry a few times, then
+        # leave them for the next forward or the final flush on shutdown
+        retries += 1
+        if retries > FLUSH_MAX_RETRIES or not application.running:
+            print(f"Giving up on {len(failed)} queued files until the next flush")
+            return
+        await _flush_wait(FLUSH_RETRY_DELAY)
+
+def schedule_flush(application):
+    """Restart the debounce timer so a burst of forwards becomes one bulk_write,
+    or write right away once a full batch is queued. A write in progress is
+    never cancelled (its failures are only re-queued once the thread returns);
+    it picks up files queued meanwhile when it finishes."""
+    global _flush_task
+    if _flush_task and not _flush_task.done():
+        if not _flush_waiting:
+            return
+        _flush_task.cancel()
+    delay = 0 if db.pending_count() >= FLUSH_BATCH_SIZE else FLUSH_DELAY
+    # Not application.create_task: Application.stop() would wait out retries
+    _flush_task = asyncio.create_task(flush_media_later(application, delay))
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = "🎬 Welcome to Movie Bot!\n\nSearch for movies/series by typing name.\n/stats - Show database info"
     if update.message.from_user.id in ADMIN_IDS:
@@ -126,6 +355,7 @@ async def handle_media_message(update: Update, context: ContextTypes.DEFAULT_TYP
         
         # Add to database
         db.add_media(forwarded.message_id, filename, file_obj.file_id)
+        schedule_flush(context.application)
         await update.message.reply_text(f"✅ Indexed: {filename}")
     except Exception as e:
         await update.message.reply_text(f"❌ Error indexing {filename}: {e}")
@@ -136,7 +366,10 @@ async def search_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not query or query.startswith('/'):
         return
     
-    results = db.fuzzy_search(query)
+    # Scoring is CPU-bound; keep the event loop free for other users.
+    # Read the version first: a file indexed meanwhile may be missing.
+    version = db.version
+    results = await asyncio.to_thread(db.fuzzy_search, query)
     
     if not results:
         return await update.message.reply_text(f"❌ No results found for '{query}'")
@@ -144,19 +377,38 @@ async def search_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Store results in context for pagination
     context.user_data['search_results'] = results
     context.user_data['search_query'] = query
+    context.user_data['search_version'] = version
     
-    await show_results_page(update.message, query, results, 0)
+    await show_results_page(update.message, query, results, 0, version)
 
 # ==========================
 # Pagination Functions
 # ==========================
-async def show_results_page(message, query, results, page):
+async def show_results_page(message, query, results, page, version):
     """Show paginated search results"""
-    total_items = len(results)
-    total_pages = (total_items + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
+    # Results fetched before the last insert may differ, so only reuse
+    # pages built against the current catalog version
+    cache_key = (query, page)
+    cached = db.markup_cache.get(cache_key) if version == db.version else None
+    if cached is None:
+        total_items = len(results)
+        total_pages = (total_items + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
+        text = f"🔍 Results for '{query}'\nPage {page+1}/{total_pages} ({total_items} results)"
+        cached = (text, build_results_markup(results, page, total_pages))
+        if version == db.version:
+            db.markup_cache[cache_key] = cached
+            if len(db.markup_cache) > MARKUP_CACHE_SIZE:
+                db.markup_cache.popitem(last=False)
+    else:
+        db.markup_cache.move_to_end(cache_key)
     
+    text, markup = cached
+    await message.reply_text(text, reply_markup=markup)
+
+def build_results_markup(results, page, total_pages):
+    """Build the inline keyboard for one page of results"""
     start_idx = page * ITEMS_PER_PAGE
-    end_idx = min((page + 1) * ITEMS_PER_PAGE, total_items)
+    end_idx = min((page + 1) * ITEMS_PER_PAGE, len(results))
     page_items = results[start_idx:end_idx]
     
     keyboard = []
@@ -170,8 +422,8 @@ async def show_results_page(message, query, results, page):
     # Individual file buttons
     for item in page_items:
         keyboard.append([InlineKeyboardButton(
-            f"📥 {item['filename']}",
-            callback_data=f"get:{item['message_id']}"
+            f"📥 {item.filename}",
+            callback_data=f"get:{item.message_id}"
         )])
     
     # Navigation buttons
@@ -189,79 +441,131 @@ async def show_results_page(message, query, results, page):
     if nav_buttons:
         keyboard.append(nav_buttons)
     
-    text = f"🔍 Results for '{query}'\nPage {page+1}/{total_pages} ({total_items} results)"
-    await message.reply_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+    return InlineKeyboardMarkup(keyboard)
 
 # ==========================
 # Button Callback Handler
 # ==========================
+async def search_expired(query):
+    """Results live in user_data, which is empty after a restart. Clicks on an
+    older results message after a newer search are not detected here."""
+    await query.edit_message_text("⌛ This search has expired. Send the name again to search.")
+
+async def page_callback(query, context, arg):
+    """Navigate to different page"""
+    page = int(arg)
+    results = context.user_data.get('search_results', [])
+    search_query = context.user_data.get('search_query', '')
+    version = context.user_data.get('search_version')
+    if page * ITEMS_PER_PAGE >= len(results):
+        return await search_expired(query)
+    
+    await query.message.delete()
+    await show_results_page(query.message, search_query, results, page, version)
+
+async def get_callback(query, context, arg):
+    """Send single file"""
+    message_id = int(arg)
+    await query.answer("Sending file...")
+    
+    try:
+        await context.bot.copy_message(
+            chat_id=query.from_user.id,
+            from_chat_id=PRIVATE_CHANNEL_ID,
+            message_id=message_id
+        )
+        await query.answer("✅ File sent!", show_alert=True)
+    except Exception as e:
+        await query.answer(f"❌ Error: {str(e)}", show_alert=True)
+
+async def sendpage_callback(query, context, arg):
+    """Send all files on current page"""
+    page = int(arg)
+    results = context.user_data.get('search_results', [])
+    
+    start_idx = page * ITEMS_PER_PAGE
+    end_idx = min((page + 1) * ITEMS_PER_PAGE, len(results))
+    page_items = results[start_idx:end_idx]
+    if not page_items:
+        return await search_expired(query)
+    
+    await query.answer(f"Sending {len(page_items)} files...")
+    
+    # One copy_messages call sends the whole page; ids must be increasing
+    sent_count = 0
+    try:
+        sent = await context.bot.copy_messages(
+            chat_id=query.from_user.id,
+            from_chat_id=PRIVATE_CHANNEL_ID,
+            message_ids=sorted(item.message_id for item in page_items)
+        )
+        sent_count = len(sent)
+    except Exception as e:
+        print(f"Error sending page {page}: {e}")
+    
+    await query.answer(f"✅ Sent {sent_count}/{len(page_items)} files!", show_alert=True)
+
+# callback_data is "<action>:<arg>"; one partition + dict lookup per click
+CALLBACK_HANDLERS = {
+    "page": page_callback,
+    "get": get_callback,
+    "sendpage": sendpage_callback,
+}
+
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
-    data = query.data
+    action, _, arg = query.data.partition(":")
     
-    if data.startswith("page:"):
-        # Navigate to different page
-        page = int(data.split(":", 1)[1])
-        results = context.user_data.get('search_results', [])
-        search_query = context.user_data.get('search_query', '')
-        
-        await query.message.delete()
-        await show_results_page(query.message, search_query, results, page)
-    
-    elif data.startswith("get:"):
-        # Send single file
-        message_id = int(data.split(":", 1)[1])
-        await query.answer("Sending file...")
-        
-        try:
-            await context.bot.copy_message(
-                chat_id=query.from_user.id,
-                from_chat_id=PRIVATE_CHANNEL_ID,
-                message_id=message_id
-            )
-            await query.answer("✅ File sent!", show_alert=True)
-        except Exception as e:
-            await query.answer(f"❌ Error: {str(e)}", show_alert=True)
-    
-    elif data.startswith("sendpage:"):
-        # Send all files on current page
-        page = int(data.split(":", 1)[1])
-        results = context.user_data.get('search_results', [])
-        
-        start_idx = page * ITEMS_PER_PAGE
-        end_idx = min((page + 1) * ITEMS_PER_PAGE, len(results))
-        page_items = results[start_idx:end_idx]
-        
-        await query.answer(f"Sending {len(page_items)} files...")
-        
-        sent_count = 0
-        for item in page_items:
-            try:
-                await context.bot.copy_message(
-                    chat_id=query.from_user.id,
-                    from_chat_id=PRIVATE_CHANNEL_ID,
-                    message_id=item['message_id']
-                )
-                sent_count += 1
-                await asyncio.sleep(0.5)  # Small delay to avoid rate limits
-            except Exception as e:
-                print(f"Error sending {item['filename']}: {e}")
-        
-        await query.answer(f"✅ Sent {sent_count}/{len(page_items)} files!", show_alert=True)
+    handler = CALLBACK_HANDLERS.get(action)
+    if handler:
+        await handler(query, context, arg)
 
 # ==========================
 # Main Entrypoint
 # ==========================
-def main():
-    port = int(os.environ.get("PORT", 10000))
-    Thread(target=lambda: app.run(host="0.0.0.0", port=port, debug=False, use_reloader=False), daemon=True).start()
+async def start_web_server(application):
+    """post_init hook: serve the health endpoints alongside polling"""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", PORT).start()
+    application.bot_data['web_runner'] = runner
 
+async def shutdown(application):
+    """post_shutdown hook: write queued media and stop the health server"""
+    # Skip a pending debounce or retry wait, but let a running write finish
+    # so anything it fails to store is back on the queue for the last flush
+    if _flush_task and not _flush_task.done():
+        if _flush_waiting:
+            _flush_task.cancel()
+        await asyncio.gather(_flush_task, return_exceptions=True)
+    failed = await flush_media()
+    if failed:
+        print(f"❌ {len(failed)} indexed files were not saved to MongoDB "
+              f"and will be missing after restart: {', '.join(failed)}")
+    runner = application.bot_data.get('web_runner')
+    if runner:
+        await runner.cleanup()
+
+def main():
     if not BOT_TOKEN:
         print("❌ Missing BOT_TOKEN")
         return
 
-    application = Application.builder().token(BOT_TOKEN).build()
+    # libuv-based loop: cheaper per-callback dispatch than the stdlib loop
+    if uvloop:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+    # Keep-alive connections with a pool large enough for bulk sends;
+    # HTTP/2 against api.telegram.org, a local Bot API server only speaks 1.1
+    builder = Application.builder().token(BOT_TOKEN).request(HTTPXRequest(
+        http_version="1.1" if BOT_API_URL else "2",
+        connection_pool_size=64,
+        pool_timeout=30
+    ))
+    if BOT_API_URL:
+        builder = builder.base_url(BOT_API_URL)
+    application = builder.post_init(start_web_server).post_shutdown(shutdown).build()
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("stats", stats))
     application.add_handler(CommandHandler("index", index_channel))